@@ -12,12 +12,24 @@ import pandas as pd
 
 from .util import (
     DEFAULT_CONFIG,
+    batched_llm_call,
+    definitions_match,
     load_data_dict,
     read_config_schema,
     read_data,
     setup_llm,
 )
 
+# field types by dtype.kind, which covers every width of a type, e.g. int32 and
+# nullable Int64; other kinds are strings
+FIELD_TYPES = {
+    "i": "number",
+    "u": "number",
+    "f": "number",
+    "M": "date",
+    "b": "bool",
+}
+
 
 class DictWriter:
     """
@@ -49,10 +61,13 @@ class DictWriter:
         )
 
         if llm and api_key:
-            self.model = setup_llm(llm, api_key)
+            self.model = setup_llm(llm, api_key, self.config.get("llm_cache_dir"))
         else:
             self.model = None
 
+        # LLM definitions already fetched, keyed by (headers, language, model)
+        self._definitions = {}
+
     def create_dict(self, data: pd.DataFrame | str) -> pd.DataFrame:
         """
         Create a basic data dictionary from a dataset.
@@ -62,6 +77,9 @@ class DictWriter:
         Also creates an empty column for field decriptions, which can either be added by
         hand later, or auto-generated with an LLM using `generate_descriptions()`.
 
+        Datasets with more rows than `common_values_sample_size` in the config are
+        randomly sampled down to that size to find common values.
+
         Parameters
         ----------
         data
@@ -76,45 +94,52 @@ class DictWriter:
         df = read_data(data, "Data")
 
         names = df.columns
-        types = [str(t) for t in df.dtypes]
-        value_opts = {}
-
-        for i in df.columns:
-            values = df[i].value_counts()
-            if len(values) <= self.config["num_choices"]:
-                try:
-                    value_opts[i] = f"{self.config['choice_delimiter']} ".join(
-                        list(values.index.values)
-                    )
-                except TypeError:
-                    value_opts[i] = np.nan
-            else:
-                value_opts[i] = np.nan
+        value_opts = np.full(len(names), np.nan, dtype=object)
+
+        # numbers, dates and bools can't be joined into common values, so only text
+        # columns with few enough unique values are counted
+        text_cols = np.flatnonzero([t.kind not in FIELD_TYPES for t in df.dtypes])
+
+        # common values converge well before the end of very large datasets
+        sample_size = self.config.get("common_values_sample_size")
+        if sample_size and len(df) > sample_size:
+            # the rows df.sample(sample_size, random_state=0) picks, taken only from
+            # the text columns so the rest of the frame isn't copied
+            rows = np.random.RandomState(0).choice(len(df), sample_size, replace=False)
+        else:
+            rows = slice(None)
+
+        separator = f"{self.config['choice_delimiter']} "
+        for i in text_cols:
+            column = df.iloc[rows, i]
+            if column.nunique() > self.config["num_choices"]:
+                continue
+            values = column.value_counts()
+            try:
+                value_opts[i] = separator.join(list(values.index.values))
+            except TypeError:
+                pass
+
+        # empty columns are read as float, but hold no numbers or choices
+        empty = df.count().to_numpy() == 0
+        value_opts[empty] = np.nan
+        types = [
+            "string"
+            if is_empty
+            else "choice"
+            if isinstance(opts, str)
+            else FIELD_TYPES.get(t.kind, "string")
+            for opts, t, is_empty in zip(value_opts, df.dtypes, empty)
+        ]
 
         dd = pd.DataFrame(
             {
                 "Field Name": names,
                 "Description": [np.nan] * len(names),
                 "Field Type": types,
-                "Common Values": value_opts.values(),
-            }
-        )
-        dd["Field Type"] = dd["Field Type"].map(
-            {
-                "object": None,
-                "int64": "number",
-                "float64": "number",
-                "datetime64[ns]": "date",
-                "boolean": "bool",
+                "Common Values": value_opts,
             }
         )
-        dd["Field Type"] = dd.apply(
-            lambda x: (
-                "choice" if isinstance(x["Common Values"], str) else x["Field Type"]
-            ),
-            axis=1,
-        )
-        dd["Field Type"] = dd["Field Type"].fillna("string")
 
         self.data_dictionary = dd
 
@@ -162,32 +187,32 @@ class DictWriter:
         df = load_data_dict(self.config, data_dict)
 
         if not self.model:
-            self.model = setup_llm(llm, key)
+            self.model = setup_llm(llm, key, self.config.get("llm_cache_dir"))
 
         headers = df.source_field
-
-        descriptions = self.model.get_definitions(list(headers), language)
-
-        descriptions = {d.field_name: d.translation for d in descriptions}
-        df_descriptions = pd.DataFrame(
-            descriptions.items(), columns=["source_field_gpt", "description"]
-        )
-
-        descrip = pd.concat([headers, df_descriptions], axis=1)
-
-        # check ordering is correct even if the return field names aren't quite the same
-        # e.g. numbering has been stripped
-        assert all(
-            descrip.apply(lambda x: x["source_field_gpt"] in x.source_field, axis=1)
+        # repeated fields only need describing once
+        unique_headers = list(dict.fromkeys(headers))
+
+        cache_key = (tuple(unique_headers), language, self.model.model)
+        definitions = self._definitions.get(cache_key)
+        if definitions is None:
+            definitions = batched_llm_call(
+                self.model.get_definitions, unique_headers, language
+            )
+
+        # check every header was described, in order
+        assert definitions_match(
+            unique_headers, definitions
         ), "Field names from the LLM don't match the originals."
 
-        descrip.drop(columns=["source_field_gpt"], inplace=True)
+        # only keep definitions that passed the check, so a retry asks the LLM again
+        self._definitions[cache_key] = definitions
 
-        new_dd = pd.merge(df, descrip, on="source_field")
-        new_dd["source_description"] = new_dd["description"]
-        new_dd.drop(columns=["description"], inplace=True)
+        # matched by position, as returned field names may differ from the headers
+        descriptions = [d.translation for d in definitions]
+        df["source_description"] = headers.map(dict(zip(unique_headers, descriptions)))
 
-        return new_dd
+        return df
 
 
 def create_dict(data: pd.DataFrame | str, config: Path | None = None) -> pd.DataFrame:
@@ -2,11 +2,20 @@
 
 from __future__ import annotations
 
+from typing import Callable
+
+from pydantic import BaseModel, ValidationError
+
+from .llm_cache import LLMCache
+
 
 class LLMBase:
-    def __init__(self, api_key, model=None):  # pragma: no cover
+    __slots__ = ("client", "model", "cache")
+
+    def __init__(self, api_key, model=None, cache_dir=None):
         self.client = None
         self.model = model
+        self.cache = LLMCache(cache_dir) if cache_dir else None
 
     def get_definitions(self, headers, language):  # pragma: no cover
         """
@@ -28,3 +37,37 @@ class LLMBase:
         """
         # subclasses should implement this method
         raise NotImplementedError
+
+    def _cached(
+        self,
+        method: str,
+        inputs: list,
+        response_type: type[BaseModel],
+        request: Callable[[], BaseModel],
+        check: Callable[[BaseModel], bool] | None = None,
+    ) -> BaseModel:
+        """
+        Return the cached response to a request if there is one, otherwise make the
+        request and cache its response.
+
+        If given, only responses passing `check` are cached or read from the cache, so
+        a bad response is requested again on the next run rather than reused.
+        """
+        if self.cache is None:
+            return request()
+
+        key = self.cache.key(type(self).__name__, self.model, method, inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            try:
+                response = response_type.model_validate_json(cached)
+            except ValidationError:
+                response = None
+            if response is not None and (check is None or check(response)):
+                return response
+
+        response = request()
+        # e.g. OpenAI returns no parsed response on a refusal
+        if response is not None and (check is None or check(response)):
+            self.cache.put(key, response.model_dump_json().encode())
+        return response
@@ -2,45 +2,127 @@
 
 from __future__ import annotations
 
-import json
+from functools import lru_cache
 
 import google.generativeai as gemini
+from google.generativeai.types.generation_types import to_generation_config_dict
+from pydantic import BaseModel, ValidationError
 
+from ..util import definitions_match
 from .base_llm import LLMBase
 from .data_structures import ColumnDescriptionRequest, MappingRequest, ValuesRequest
+from .llm_cache import canonical_json
+
+# number of times Gemini is asked for a response matching the expected structure
+MAX_ATTEMPTS = 3
+
+# appended once to each prompt, so headers and values come back exactly as sent
+PRESERVE_CHARACTERS = " Preserve special characters (accents, hyphens)."
+
+DEFINITIONS_PROMPT = (
+    "You are an expert at structured data extraction. "
+    "The following is a list of headers from a data file in "
+    "{language}, some containing shortened words or abbreviations. "
+    "Translate them to english. "
+    "Return a list of (original header, translation) pairs, using the given structure."
+) + PRESERVE_CHARACTERS
+
+FIELDS_PROMPT = (
+    "You are an expert at structured data extraction. "
+    "You will be given two lists of phrases, one is the headers for a "
+    "target data file, and the other a set of descriptions for columns "
+    "of source data. "
+    "Match each target header to the best matching source description, "
+    "but match a header to None if a good match does not exist. "
+    "Return the matched target headers and source descriptions using the provided "
+    "structure."
+) + PRESERVE_CHARACTERS
+
+VALUES_PROMPT = (
+    "You are an expert at structured data extraction. "
+    "You will be given a list of tuples, where each tuple contains "
+    "three sets of string values. "
+    "The first set contains field names for a dataset. "
+    "The second set contains values from a source dataset in "
+    "{language}, and the third set contains target values for an "
+    "english-language transformed dataset. "
+    "Match all the values in the second set to the appropriate values "
+    "in the third set. "
+    "Return a list of dictionaries, where each dictionary contains the "
+    "field name as a key, and a dictionary containing "
+    "source values as keys, and the target text as values, "
+    "as the values. For example, the result should look like this: "
+    "[{{'field_name_1': {{'source_value_a': 'target_value_a', "
+    "'source_value_b': 'target_value_b'}}, 'field_name_2':{{...}}] "
+    "using the provided structure."
+) + PRESERVE_CHARACTERS
+
+
+@lru_cache
+def generation_config(response_type: type[BaseModel]) -> dict:
+    """
+    Generation config requesting JSON with the structure of `response_type`.
+
+    The response schema is converted from the pydantic model once, instead of on
+    every request.
+    """
+    return to_generation_config_dict(
+        gemini.GenerationConfig(
+            response_mime_type="application/json", response_schema=response_type
+        )
+    )
 
 
 class GeminiLanguageModel(LLMBase):
-    def __init__(self, api_key, model: str = "gemini-1.5-flash"):
+    __slots__ = ()
+
+    def __init__(self, api_key, model: str = "gemini-1.5-flash", cache_dir=None):
+        super().__init__(api_key, model, cache_dir)
         gemini.configure(api_key=api_key)
         self.client = gemini.GenerativeModel(model)
-        self.model = model
+
+    def _generate(self, prompt: list[str], response_type: type[BaseModel]):
+        """
+        Request a response with the structure of `response_type` from Gemini.
+
+        If the response doesn't validate, the error is sent back to Gemini to correct
+        it, rather than discarding the whole request.
+        """
+        contents = [{"role": "user", "parts": prompt}]
+        for attempt in range(MAX_ATTEMPTS):
+            result = self.client.generate_content(
+                contents, generation_config=generation_config(response_type)
+            )
+            try:
+                return response_type.model_validate_json(result.text)
+            except ValidationError as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                contents += [
+                    {"role": "model", "parts": [result.text]},
+                    {
+                        "role": "user",
+                        "parts": [
+                            f"That response was invalid: {e}\n"
+                            "Correct it, using the given structure."
+                        ],
+                    },
+                ]
 
     def get_definitions(self, headers: list[str], language: str) -> dict[str, str]:
         """
         Get the definitions of the columns in the dataset using the Gemini API.
         """
-        result = self.client.generate_content(
-            [
-                (
-                    "You are an expert at structured data extraction. "
-                    "The following is a list of headers from a data file in "
-                    f"{language}, some containing shortened words or abbreviations. "
-                    "Translate them to english. "
-                    "Return a list of (original header, translation) pairs, using the given structure."  # noqa
-                    "Preserve special characters such as accented letters and hyphens."
-                ),
-                f"{headers}",
-            ],
-            generation_config=gemini.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=ColumnDescriptionRequest,
-            ),
-        )
-        descriptions = ColumnDescriptionRequest.model_validate(
-            json.loads(result.text)
+        payload = canonical_json(headers)
+        prompt = [DEFINITIONS_PROMPT.format(language=language), payload]
+
+        return self._cached(
+            "get_definitions",
+            [payload, language],
+            ColumnDescriptionRequest,
+            lambda: self._generate(prompt, ColumnDescriptionRequest),
+            lambda r: definitions_match(headers, r.field_descriptions),
         ).field_descriptions
-        return descriptions
 
     def map_fields(
         self, source_fields: list[str], target_fields: list[str]
@@ -48,62 +130,40 @@ class GeminiLanguageModel(LLMBase):
         """
         Calls the Gemini API to generate a draft mapping between two datasets.
         """
-        result = self.client.generate_content(
-            [
-                (
-                    "You are an expert at structured data extraction. "
-                    "You will be given two lists of phrases, one is the headers for a "
-                    "target data file, and the other a set of descriptions for columns "
-                    "of source data. "
-                    "Match each target header to the best matching source description, "
-                    "but match a header to None if a good match does not exist. "
-                    "Preserve special characters such as accented letters and hyphens."
-                    "Return the matched target headers and source descriptions using the provided structure."  # noqa
-                ),
-                (
-                    f"These are the target headers: {target_fields}\n"
-                    f"These are the source descriptions: {source_fields}"
-                ),
-            ],
-            generation_config=gemini.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=MappingRequest,
+        sources = canonical_json(source_fields)
+        targets = canonical_json(target_fields)
+        prompt = [
+            FIELDS_PROMPT,
+            (
+                f"These are the target headers: {targets}\n"
+                f"These are the source descriptions: {sources}"
             ),
+        ]
+
+        return self._cached(
+            "map_fields",
+            [sources, targets],
+            MappingRequest,
+            lambda: self._generate(prompt, MappingRequest),
         )
-        return MappingRequest.model_validate(json.loads(result.text))
 
     def map_values(
-        self, values: list[tuple[str, set[str], list[str | None] | None]], language: str
+        self,
+        values: list[tuple[str, list[str], list[str | None] | None]],
+        language: str,
     ) -> ValuesRequest:
         """
         Calls the Gemini API to generate a set of value mappings for the fields.
         """
-        result = self.client.generate_content(
-            [
-                (
-                    "You are an expert at structured data extraction. "
-                    "You will be given a list of tuples, where each tuple contains "
-                    "three sets of string values. "
-                    "The first set contains field names for a dataset."
-                    "The second set contains values from a source dataset in "
-                    f"{language}, and the third set contains target values for an "
-                    "english-language transformed dataset. "
-                    "Match all the values in the second set to the appropriate values "
-                    "in the third set. "
-                    "Return a list of dictionaries, where each dictionary contains the "
-                    "field name as a key, and a dictionary containing "
-                    "source values as keys, and the target text as values, "
-                    "as the values. For example, the result should look like this: "
-                    "[{'field_name_1': {'source_value_a': 'target_value_a', "
-                    "'source_value_b': 'target_value_b'}, 'field_name_2':{...}]"
-                    "using the provided structure."
-                    "Preserve special characters such as accented letters and hyphens."
-                ),
-                f"These are the field, source, target value sets: {values}",
-            ],
-            generation_config=gemini.GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=ValuesRequest,
-            ),
+        payload = canonical_json(values)
+        prompt = [
+            VALUES_PROMPT.format(language=language),
+            f"These are the field, source, target value sets: {payload}",
+        ]
+
+        return self._cached(
+            "map_values",
+            [payload, language],
+            ValuesRequest,
+            lambda: self._generate(prompt, ValuesRequest),
         )
-        return ValuesRequest.model_validate(json.loads(result.text))
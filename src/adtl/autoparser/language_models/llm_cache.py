@@ -0,0 +1,68 @@
+"On-disk cache of LLM responses, so repeated requests don't call the API again."
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+# bump whenever a prompt changes, so responses to old prompts aren't reused
+PROMPT_VERSION = "3"
+
+
+def canonical_json(obj) -> str:
+    """
+    Compact JSON for LLM inputs, used both in prompts and to key the cache.
+
+    Sets are sorted, so the same values always give the same prompt and key.
+    """
+    return json.dumps(
+        obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=sorted
+    )
+
+
+class LLMCache:
+    """
+    Stores LLM responses as JSON files under `cache_dir`, keyed by a SHA-256 hash of
+    the provider, model, method and inputs of the request.
+
+    Parameters
+    ----------
+    cache_dir
+        Directory to store cached responses in, created if it doesn't exist.
+    """
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Hash the parts of a request into a cache key."""
+        payload = canonical_json([PROMPT_VERSION, *parts])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached response for `key`, or None if there isn't one."""
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, response: bytes):
+        """Cache a response under `key`."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written to a temporary file first, so a partly written file is never read
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(response)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -45,14 +45,14 @@ def refs_defs(choices, num_refs):
     references = {}
     definitions = {}
 
-    top_mappings = choices[choices > 1][:num_refs].index
+    top_mappings = choices[choices > 1].head(num_refs).index
 
-    # only add one boolean map for simplicity
     boolean_map_found = False
     for mapping in top_mappings:
-        if boolean_map_found and True in mapping.values():
-            continue
         if True in mapping.values():
+            # only add one boolean map for simplicity
+            if boolean_map_found:
+                continue
             references[json.dumps(mapping, sort_keys=True)] = "Y/N/NK"
             definitions["Y/N/NK"] = {
                 "caseInsensitive": True,
@@ -139,16 +139,35 @@ class ParserGenerator:
         try:
             return self._parsed_choices
         except AttributeError:
-            self._parsed_choices = self.mappings.value_mapping.map(parse_choices)
+            # many fields share a mapping (e.g. yes/no), so parse each one once
+            values = self.mappings.value_mapping
+            parsed = {v: parse_choices(v) for v in values.dropna().unique()}
+            self._parsed_choices = values.map(parsed.get)
             self._parsed_choices.index = self.mappings.target_field
             return self._parsed_choices
 
+    @property
+    def choice_keys(self) -> pd.Series:
+        """Returns the mapped values for each target field as JSON, to find references"""
+        try:
+            return self._choice_keys
+        except AttributeError:
+            self._choice_keys = self.parsed_choices.map(
+                lambda c: json.dumps(c, sort_keys=True) if c else None
+            )
+            return self._choice_keys
+
     @property
     def references_definitions(self) -> tuple[dict[str, str], dict[str, dict]]:
         """Finds and returns the references and definitions for the mappings"""
         try:
             return self._references_definitions
         except AttributeError:
+            # without any value mappings there is nothing to reference
+            if self.parsed_choices.isna().all():
+                self._references_definitions = ({}, {})
+                return self._references_definitions
+
             # use value_counts() on parsed_choices normalise various flavours of Y/N/NK
             value_counts = self.parsed_choices.value_counts()
 
@@ -161,15 +180,15 @@ class ParserGenerator:
         """Returns all the fields for `table` and their properties"""
         return self.schemas[table]["properties"]
 
-    def single_field_mapping(self, match: pd.DataFrame) -> dict[str, Any]:
+    def single_field_mapping(self, match: tuple) -> dict[str, Any]:
         """Make a single field mapping from a single row of the mappings dataframe"""
 
         choices = self.parsed_choices[match.target_field]
 
         out = {"field": match.source_field, "description": match.source_description}
-        references = self.references_definitions[0]
         if choices:
-            if (choice_key := json.dumps(choices, sort_keys=True)) in references:
+            references = self.references_definitions[0]
+            if (choice_key := self.choice_keys[match.target_field]) in references:
                 out["ref"] = references[choice_key]
             else:
                 out["values"] = choices
@@ -182,24 +201,28 @@ class ParserGenerator:
 
         outmap = {}
 
-        for field, field_matches in self.mappings.groupby("target_field"):
-            if len(field_matches) == 1:  # single field
-                if not any(field_matches["source_field"].isna()):
-                    outmap[field] = self.single_field_mapping(field_matches.iloc[0])
+        # rows in target field order, skipping fields with no target
+        mappings = self.mappings.dropna(subset="target_field").sort_values(
+            "target_field"
+        )
+
+        # combinedType, where one target field is mapped from several source fields
+        if mappings.target_field.duplicated().any():
+            raise NotImplementedError("CombinedType not supported")
 
-            else:  # combinedType
-                raise NotImplementedError("CombinedType not supported")
+        # only target fields with a matching source field are mapped
+        mapped = mappings[mappings.source_field.notna()]
+        for match in mapped.itertuples(index=False):
+            outmap[match.target_field] = self.single_field_mapping(match)
 
         # check for missing required fields
-        schema = self.schemas[table]
-        if "required" in schema:
-            for field in schema["required"]:
-                if field not in outmap:
-                    logging.warning(
-                        f"Missing required field {field} in {table} schema."
-                        " Adding empty field..."
-                    )
-                    outmap[field] = ""
+        for field in self.schemas[table].get("required", []):
+            if field not in outmap:
+                logging.warning(
+                    f"Missing required field {field} in {table} schema."
+                    " Adding empty field..."
+                )
+                outmap[field] = ""
 
         return {table: outmap}
 
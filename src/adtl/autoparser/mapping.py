@@ -14,6 +14,8 @@ import pandas as pd
 
 from .util import (
     DEFAULT_CONFIG,
+    LLM_VALUES_BATCH_SIZE,
+    batched_llm_call,
     load_data_dict,
     read_config_schema,
     read_json,
@@ -57,15 +59,15 @@ class Mapper:
         self.schema = read_json(schema)
         self.schema_properties = self.schema["properties"]
         self.language = language
-        if llm is None:
-            self.model = None
-        else:
-            self.model = setup_llm(llm, api_key)
-
         self.config = read_config_schema(
             config or Path(Path(__file__).parent, DEFAULT_CONFIG)
         )
 
+        if llm is None:
+            self.model = None
+        else:
+            self.model = setup_llm(llm, api_key, self.config.get("llm_cache_dir"))
+
         self.data_dictionary = load_data_dict(self.config, data_dictionary)
 
     @property
@@ -113,23 +115,34 @@ class Mapper:
     @property
     def common_values(self) -> pd.Series:
         """
-        Returns the commonly repeated values in the source data
+        Returns the commonly repeated values in the source data, lowercased and
+        deduplicated in order of appearance.
         Usually this indicates that the source field is an enum or boolean
         """
         try:
             return self._common_values
         except AttributeError:
             if "common_values" in self.data_dictionary.columns:
-
-                def _lower_string(x):
-                    if isinstance(x, str):
-                        return {
-                            y.lower().strip()
-                            for y in x.split(self.config["choice_delimiter"])
-                        }
-
-                cv = self.data_dictionary.common_values
-                cv = cv.apply(_lower_string)
+                # grouped by position, as the dictionary's index may repeat
+                cv = self.data_dictionary.common_values.reset_index(drop=True)
+                # only strings hold common values, e.g. numbers or bools don't
+                strings = cv[cv.map(lambda x: isinstance(x, str))]
+                values = (
+                    strings.astype(object)
+                    .str.lower()
+                    .str.split(self.config["choice_delimiter"])
+                    .explode()
+                    .str.strip()
+                )
+                values = values[values.str.len() > 0]
+                # dedupe while keeping the order values appear in the dictionary
+                cv = (
+                    values.groupby(level=0)
+                    .agg(lambda x: list(dict.fromkeys(x)))
+                    .reindex(range(len(cv)))
+                    .astype(object)
+                    .replace({np.nan: None})
+                )
                 cv.index = self.data_dictionary.source_field
                 self._common_values = cv
             elif "choices" in self.data_dictionary.columns:
@@ -179,8 +192,9 @@ class Mapper:
         source data fields from the data dictionary.
         """
 
-        # english translated descriptions rather than names.
-        source_fields = list(self.data_dictionary.source_description)
+        # english translated descriptions rather than names, each sent once as
+        # repeats don't change the match
+        source_fields = list(dict.fromkeys(self.data_dictionary.source_description))
 
         mappings = self.model.map_fields(source_fields, self.target_fields)
 
@@ -218,12 +232,17 @@ class Mapper:
             if s and t:
                 values_tuples.append((f, s, t))
 
-        # to LLM
-        value_pairs = self.model.map_values(values_tuples, self.language)
+        # to LLM, a few fields at a time
+        value_pairs = batched_llm_call(
+            lambda batch, language: self.model.map_values(batch, language).values,
+            values_tuples,
+            self.language,
+            batch_size=LLM_VALUES_BATCH_SIZE,
+        )
 
         value_mapping = {}
 
-        for p in value_pairs.values:
+        for p in value_pairs:
             f = p.field_name
             value_dict = {
                 pair.source_value: pair.target_value for pair in p.mapped_values
@@ -6,17 +6,29 @@ from __future__ import annotations
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
+import numpy as np
 import pandas as pd
-import tomli
 
-from adtl.autoparser.language_models.gemini import GeminiLanguageModel
-from adtl.autoparser.language_models.openai import OpenAILanguageModel
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    import tomli as tomllib
 
 DEFAULT_CONFIG = "config/autoparser.toml"
 
+# splits on commas, except those inside [square brackets]
+CHOICE_SEPARATOR = re.compile(r",(?!(?:[^\[]*\])|(?:[^\[]*\[[^\]]*$))")
+
+# number of items sent to the LLM per request, and requests made at once
+LLM_BATCH_SIZE = 50
+LLM_MAX_WORKERS = 8
+# each field's value sets make for a much longer prompt than a header
+LLM_VALUES_BATCH_SIZE = 4
+
 
 def read_config_schema(path: str | Path) -> Dict:
     if isinstance(path, str):
@@ -26,7 +38,7 @@ def read_config_schema(path: str | Path) -> Dict:
         return read_json(path)
     elif path.suffix == ".toml":
         with path.open("rb") as fp:
-            return tomli.load(fp)
+            return tomllib.load(fp)
     else:
         raise ValueError(
             f"read_config_schema(): Unsupported file format: {path.suffix}"
@@ -76,18 +88,18 @@ def parse_choices(s: str) -> Dict[str, Any] | None:
     if not isinstance(s, str):
         return None
 
-    split_str = re.split(r",(?!(?:[^\[]*\])|(?:[^\[]*\[[^\]]*$))", s)
-    choices_list = [tuple(x.strip().split("=")) for x in split_str]
+    choices_list = [tuple(x.strip().split("=")) for x in CHOICE_SEPARATOR.split(s)]
     if any(len(c) != 2 for c in choices_list):
         raise ValueError(f"Invalid choices list {choices_list!r}")
     choices = dict(choices_list)
 
     for k, v in choices.copy().items():
-        if v.lower() == "true":
+        value = v.lower()
+        if value == "true":
             choices[k] = True
-        if v.lower() == "false":
+        if value == "false":
             choices[k] = False
-        if v.lower() == "none":
+        if value == "none":
             if k == "":
                 choices.pop(k)
             else:
@@ -112,11 +124,10 @@ def load_data_dict(
             raise ValueError(f"Unsupported format (not CSV or XLSX): {data_dict}")
 
     column_mappings = {v: k for k, v in config["column_mappings"].items()}
-    data_dict.rename(columns=column_mappings, inplace=True)
-    return data_dict
+    return data_dict.rename(columns=column_mappings)
 
 
-def setup_llm(provider, api_key):
+def setup_llm(provider, api_key, cache_dir=None):
     """
     Setup the LLM to use to generate descriptions.
 
@@ -129,13 +140,54 @@ def setup_llm(provider, api_key):
         API key
     name
         Name of the LLM to use (currently only OpenAI and Gemini are supported)
+    cache_dir
+        Directory to cache LLM responses in, or None to not cache them
     """
     if api_key is None:
         raise ValueError("API key required to set up an LLM")
 
+    # backends are imported on demand, as their client libraries are slow to load
     if provider == "openai":  # pragma: no cover
-        return OpenAILanguageModel(api_key=api_key)
+        from adtl.autoparser.language_models.openai import OpenAILanguageModel
+
+        return OpenAILanguageModel(api_key=api_key, cache_dir=cache_dir)
     elif provider == "gemini":  # pragma: no cover
-        return GeminiLanguageModel(api_key=api_key)
+        from adtl.autoparser.language_models.gemini import GeminiLanguageModel
+
+        return GeminiLanguageModel(api_key=api_key, cache_dir=cache_dir)
     else:
         raise ValueError(f"Unsupported LLM provider: {provider}")
+
+
+def batched_llm_call(
+    func: Callable[..., list], items: list, *args, batch_size: int = LLM_BATCH_SIZE
+) -> list:
+    """
+    Call `func(batch, *args)` on batches of `items`, returning the combined results
+    in the original order.
+
+    Batches are sent concurrently, keeping prompts short and the total time close to
+    that of a single request.
+    """
+    batches = [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+    if len(batches) <= 1:
+        return func(items, *args)
+
+    with ThreadPoolExecutor(max_workers=min(LLM_MAX_WORKERS, len(batches))) as pool:
+        results = pool.map(lambda batch: func(batch, *args), batches)
+        return [r for result in results for r in result]
+
+
+def definitions_match(headers: list[str], definitions: list) -> bool:
+    """
+    Check an LLM returned one definition per header, in the same order.
+
+    Returned field names only have to be contained in the original headers, as the
+    LLM may e.g. strip numbering.
+    """
+    names = [d.field_name for d in definitions]
+    return len(names) == len(headers) and bool(
+        (
+            np.char.find(np.array(headers, dtype=str), np.array(names, dtype=str)) >= 0
+        ).all()
+    )
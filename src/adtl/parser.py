@@ -16,16 +16,19 @@ from pathlib import Path
 from typing import Any, Callable, Iterable, Literal, Union
 
 import fastjsonschema
-import pint
 import requests
-import tomli
 from more_itertools import unique_everseen
 from tqdm.autonotebook import tqdm
 
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    import tomli as tomllib
+
 import adtl.transformations as tf
 from adtl.transformations import AdtlTransformationWarning
 
-SUPPORTED_FORMATS = {"json": json.load, "toml": tomli.load}
+SUPPORTED_FORMATS = {"json": json.load, "toml": tomllib.load}
 DEFAULT_DATE_FORMAT = "%Y-%m-%d"
 
 StrDict = dict[str, Any]
@@ -80,26 +83,22 @@ def get_value_unhashed(row: StrDict, rule: Rule, ctx: Context = None) -> Any:
             params = None
             if "params" in rule["apply"]:
                 params = []
-                for i in range(len(rule["apply"]["params"])):
-                    if isinstance(rule["apply"]["params"][i], str) and rule["apply"][
-                        "params"
-                    ][i].startswith("$"):
-                        params.append(row[rule["apply"]["params"][i][1:]])
-                    elif isinstance(rule["apply"]["params"][i], list):
-                        param = [
-                            (
-                                row[rule["apply"]["params"][i][j][1:]]
-                                if (
-                                    isinstance(rule["apply"]["params"][i][j], str)
-                                    and rule["apply"]["params"][i][j].startswith("$")
+                for param in rule["apply"]["params"]:
+                    if isinstance(param, str) and param.startswith("$"):
+                        params.append(row[param[1:]])
+                    elif isinstance(param, list):
+                        params.append(
+                            [
+                                (
+                                    row[p[1:]]
+                                    if isinstance(p, str) and p.startswith("$")
+                                    else p
                                 )
-                                else rule["apply"]["params"][i][j]
-                            )
-                            for j in range(len(rule["apply"]["params"][i]))
-                        ]
-                        params.append(param)
+                                for p in param
+                            ]
+                        )
                     else:
-                        params.append(rule["apply"]["params"][i])
+                        params.append(param)
 
             try:
                 with warnings.catch_warnings():
@@ -148,6 +147,8 @@ def get_value_unhashed(row: StrDict, rule: Rule, ctx: Context = None) -> Any:
                     "rule: {rule}, defaulting to assume source_unit is {unit}"
                 )
                 return float(value)
+            import pint  # slow to import, so only loaded when converting units
+
             try:
                 value = pint.Quantity(float(value), source_unit).to(unit).m
             except ValueError:
@@ -184,6 +185,11 @@ def matching_fields(fields: list[str], pattern: str) -> list[str]:
     return [f for f in fields if compiled_pattern.match(f)]
 
 
+@lru_cache
+def _match_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern, re.IGNORECASE)
+
+
 def parse_if(
     row: StrDict, rule: StrDict, ctx: Callable[[str], dict] = None, can_skip=False
 ) -> bool:
@@ -235,7 +241,7 @@ def parse_if(
         elif cmp in ["=", "=="]:
             return cast_value == value
         elif cmp == "=~":
-            return bool(re.match(value, cast_value, re.IGNORECASE))
+            return bool(_match_pattern(value).match(cast_value))
         else:
             raise ValueError(f"Unrecognized operand: {cmp}")
     elif isinstance(rule[key], set):  # common error, missed colon to make it a dict
@@ -459,14 +465,15 @@ def make_fields_optional(
     "Returns JSON schema with required fields modified to drop optional fields"
     if optional_fields is None:
         return schema
+    optional_fields = frozenset(optional_fields)
     _schema = copy.deepcopy(schema)
-    _schema["required"] = sorted(set(schema["required"]) - set(optional_fields))
+    _schema["required"] = sorted(set(schema["required"]) - optional_fields)
     for opt in ["oneOf", "anyOf"]:
         if opt in _schema:
             if any("required" in _schema[opt][x] for x in range(len(_schema[opt]))):
                 for x in range(len(_schema[opt])):
                     _schema[opt][x]["required"] = list(
-                        set(_schema[opt][x]["required"]) - set(optional_fields or [])
+                        set(_schema[opt][x]["required"]) - optional_fields
                     )
                 if all(
                     all(bool(v) is False for v in _schema[opt][x].values())
@@ -478,6 +485,20 @@ def make_fields_optional(
     return _schema
 
 
+@lru_cache(maxsize=32)
+def _compile_schema(schema: str) -> Callable[[Any], Any]:
+    return fastjsonschema.compile(json.loads(schema))
+
+
+def compile_validator(schema: dict[str, Any]) -> Callable[[Any], Any]:
+    """Returns a compiled validator for a JSON schema
+
+    Compilation generates and executes Python code, so validators are cached
+    by schema content and reused when the same schema is loaded again.
+    """
+    return _compile_schema(json.dumps(schema, sort_keys=True))
+
+
 def relative_path(source_file, target_file):
     return Path(source_file).parent / target_file
 
@@ -491,7 +512,7 @@ def read_definition(file: Path) -> dict[str, Any]:
             return json.load(fp)
     elif file.suffix == ".toml":
         with file.open("rb") as fp:
-            return tomli.load(fp)
+            return tomllib.load(fp)
     else:
         raise ValueError(f"Unsupported file format: {file}")
 
@@ -607,7 +628,7 @@ class Parser:
                             json.load(fp), optional_fields
                         )
                 self.date_fields.extend(get_date_fields(self.schemas[table]))
-                self.validators[table] = fastjsonschema.compile(self.schemas[table])
+                self.validators[table] = compile_validator(self.schemas[table])
 
         self._set_field_names()
 
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Literal
-
-import pandas as pd
+from typing import TYPE_CHECKING, Literal
 
 from adtl import Parser
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 def parse(
     spec: str | Path | dict[str, str],
@@ -28,6 +29,8 @@ def parse(
     Returns:
         dict[str, pd.DataFrame]: Dictionary of tables parsed into new format
     """
+    import pandas as pd
+
     spec = Parser(spec, include_defs=include_defs)
 
     # check for incompatible options
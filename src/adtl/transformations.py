@@ -16,8 +16,6 @@ except ImportError:  # pragma: no cover
 import re
 import warnings
 
-import pint
-
 
 class AdtlTransformationWarning(UserWarning):
     pass
@@ -155,6 +153,8 @@ def yearsElapsed(
 
     cd = datetime.strptime(currentdate, cd_format)
 
+    import pint  # slow to import, so only loaded when needed
+
     try:
         days = cd - bd
         return pint.Quantity(days.days, "days").to("years").m
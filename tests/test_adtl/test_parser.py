@@ -745,6 +745,12 @@ def test_validation(snapshot):
     assert buf == snapshot
 
 
+def test_validators_reused_across_parsers():
+    first = parser.Parser(TEST_PARSERS_PATH / "groupBy-with-schema.json")
+    second = parser.Parser(TEST_PARSERS_PATH / "groupBy-with-schema.json")
+    assert first.validators["subject"] is second.validators["subject"]
+
+
 def test_multi_id_groupby(snapshot):
     ps = parser.Parser(TEST_PARSERS_PATH / "groupBy-multi-id.json")
     buf = ps.parse_rows(SOURCE_GROUPBY_MULTI_ID).write_csv("subject")
@@ -3,12 +3,14 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
-from testing_data_animals import TestLLM
+from testing_data_animals import TestLLM, get_definitions
 
 import adtl.autoparser as autoparser
 from adtl.autoparser.dict_writer import DictWriter, main
+from adtl.autoparser.language_models.data_structures import SingleField
 from adtl.autoparser.language_models.openai import OpenAILanguageModel
 
 CONFIG_PATH = "tests/test_autoparser/test_config.toml"
@@ -48,6 +50,78 @@ def test_create_dict_no_descrip():
     pd.testing.assert_frame_equal(df, df_desired)
 
 
+def test_dictionary_creation_field_types():
+    writer = DictWriter(config=CONFIG_PATH)
+    n = 20
+    data = pd.DataFrame(
+        {
+            "int32": pd.Series(range(n), dtype="int32"),
+            "uint8": pd.Series(range(n), dtype="uint8"),
+            "float32": pd.Series(range(n), dtype="float32"),
+            "nullable_int": pd.Series(range(n), dtype="Int64"),
+            "date": pd.date_range("2024-01-01", periods=n),
+            "flag": [True, False] * (n // 2),
+            "text": [f"text_{i}" for i in range(n)],
+        }
+    )
+
+    df = writer.create_dict(data)
+
+    assert list(df["Field Type"]) == [
+        "number",
+        "number",
+        "number",
+        "number",
+        "date",
+        "bool",
+        "string",
+    ]
+
+
+def test_dictionary_creation_empty_columns():
+    writer = DictWriter(config=CONFIG_PATH)
+    data = pd.DataFrame(
+        {
+            "empty_float": [np.nan] * 3,
+            "empty_object": pd.Series([None] * 3, dtype=object),
+            "animal": ["cat", "dog", None],
+        }
+    )
+
+    df = writer.create_dict(data)
+
+    assert list(df["Field Type"]) == ["string", "string", "choice"]
+    assert df["Common Values"].isna().tolist() == [True, True, False]
+
+
+def test_dictionary_creation_sampled():
+    writer = DictWriter(config=CONFIG_PATH)
+    data = pd.DataFrame({"animal": [f"animal_{i}" for i in range(100)]})
+
+    df = writer.create_dict(data)
+    assert df.loc[0, "Field Type"] == "string"
+
+    writer.config["common_values_sample_size"] = 5
+    df = writer.create_dict(data)
+    assert df.loc[0, "Field Type"] == "choice"
+    assert len(df.loc[0, "Common Values"].split(", ")) == 5
+
+
+def test_dictionary_creation_sampled_rows():
+    writer = DictWriter(config=CONFIG_PATH)
+    writer.config["common_values_sample_size"] = 5
+    data = pd.DataFrame(
+        {"weight": range(100), "animal": [f"animal_{i}" for i in range(100)]}
+    )
+
+    df = writer.create_dict(data)
+
+    # same rows as sampling the whole frame
+    sampled = data.sample(5, random_state=0)["animal"]
+    assert df.loc[1, "Common Values"] == ", ".join(sampled.value_counts().index)
+    assert list(df["Field Type"]) == ["number", "choice"]
+
+
 def test_dictionary_creation_no_descrip_excel_dataframe():
     writer = DictWriter(config=CONFIG_PATH)
 
@@ -74,6 +148,89 @@ def test_dictionary_description():
     pd.testing.assert_frame_equal(df, df_desired)
 
 
+def test_dictionary_description_mismatched_fields(monkeypatch):
+    writer = DictWriter(config=Path(CONFIG_PATH))
+    writer.model = TestLLM()
+
+    def reversed_definitions(headers, language):
+        return list(reversed(get_definitions(headers, language)))
+
+    monkeypatch.setattr(writer.model, "get_definitions", reversed_definitions)
+
+    with pytest.raises(AssertionError, match="Field names from the LLM don't match"):
+        writer.generate_descriptions("fr", SOURCES + "animals_dd.csv")
+
+
+def test_dictionary_description_cached(monkeypatch):
+    writer = DictWriter(config=Path(CONFIG_PATH))
+    writer.model = TestLLM()
+
+    calls = []
+
+    def counted_definitions(headers, language):
+        calls.append(headers)
+        return get_definitions(headers, language)
+
+    monkeypatch.setattr(writer.model, "get_definitions", counted_definitions)
+
+    first = writer.generate_descriptions("fr", SOURCES + "animals_dd.csv")
+    second = writer.generate_descriptions("fr", SOURCES + "animals_dd.csv")
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_dictionary_description_mismatch_not_cached(monkeypatch):
+    writer = DictWriter(config=Path(CONFIG_PATH))
+    writer.model = TestLLM()
+
+    responses = [
+        list(reversed(get_definitions())),
+        get_definitions(),
+    ]
+
+    def next_definitions(headers, language):
+        return responses.pop(0)
+
+    monkeypatch.setattr(writer.model, "get_definitions", next_definitions)
+
+    with pytest.raises(AssertionError, match="Field names from the LLM don't match"):
+        writer.generate_descriptions("fr", SOURCES + "animals_dd.csv")
+
+    # the retry asks the LLM again rather than reusing the bad response
+    df = writer.generate_descriptions("fr", SOURCES + "animals_dd.csv")
+
+    assert responses == []
+    pd.testing.assert_frame_equal(df, pd.read_csv(SOURCES + "animals_dd_described.csv"))
+
+
+def test_dictionary_description_stripped_numbering(monkeypatch):
+    writer = DictWriter(config=Path(CONFIG_PATH))
+    writer.model = TestLLM()
+
+    def stripped_definitions(headers, language):
+        # the LLM drops the numbering, leaving repeated field names
+        return [
+            SingleField(field_name="age", translation="Age (years)"),
+            SingleField(field_name="age", translation="Age (months)"),
+        ]
+
+    monkeypatch.setattr(writer.model, "get_definitions", stripped_definitions)
+
+    data_dict = pd.DataFrame(
+        {
+            "Field Name": ["1. age", "2. age"],
+            "Description": [None, None],
+            "Field Type": ["number", "number"],
+            "Common Values": [None, None],
+        }
+    )
+
+    df = writer.generate_descriptions("fr", data_dict)
+
+    assert list(df["source_description"]) == ["Age (years)", "Age (months)"]
+
+
 def test_missing_key_error():
     with pytest.raises(ValueError, match="API key required"):
         DictWriter(config=Path(CONFIG_PATH)).generate_descriptions(
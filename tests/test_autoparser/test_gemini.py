@@ -1,10 +1,15 @@
 "Tests the OpenAILanguageModel class."
 
+import pytest
 from google.generativeai import protos
 from google.generativeai.types import GenerateContentResponse
 from testing_data_animals import get_definitions, map_fields, map_values
 
-from adtl.autoparser.language_models.gemini import GeminiLanguageModel
+from adtl.autoparser.language_models.data_structures import ValuesRequest
+from adtl.autoparser.language_models.gemini import (
+    GeminiLanguageModel,
+    generation_config,
+)
 
 
 def test_init():
@@ -121,3 +126,144 @@ def test_map_values(monkeypatch):
 
     # Assert the expected output
     assert result == map_values()
+
+
+def test_map_values_cached(monkeypatch, tmp_path):
+    values = [("pet", {"oui", "non"}, ["True", "False", "None"])]
+    json_str = '{"values": [{"field_name": "pet", "mapped_values": [{"source_value": "oui", "target_value": "True"}, {"source_value": "non", "target_value": "False"}]}]}'  # noqa
+    calls = []
+
+    def mock_generate_content(*args, **kwargs):
+        calls.append(args)
+        res = protos.GenerateContentResponse(
+            candidates=[
+                protos.Candidate(
+                    content=protos.Content(
+                        parts=[protos.Part(text=json_str)], role="model"
+                    ),
+                    finish_reason="STOP",
+                )
+            ]
+        )
+
+        return GenerateContentResponse(done=True, iterator=None, result=res, chunks=[])
+
+    model = GeminiLanguageModel("1234", cache_dir=tmp_path)
+    monkeypatch.setattr(model.client, "generate_content", mock_generate_content)
+    result = model.map_values(values, "fr")
+
+    # a new model sharing the cache shouldn't call the API again
+    rerun = GeminiLanguageModel("1234", cache_dir=tmp_path)
+    monkeypatch.setattr(rerun.client, "generate_content", mock_generate_content)
+
+    assert rerun.map_values(values, "fr") == result
+    assert len(calls) == 1
+
+    # different inputs aren't served from the cache
+    rerun.map_values(values, "es")
+    assert len(calls) == 2
+
+
+def mock_responses(model, monkeypatch, *json_strs):
+    "Mocks Gemini returning each of `json_strs` in turn, recording the requests."
+    requests = []
+
+    def mock_generate_content(contents, **kwargs):
+        requests.append(list(contents))
+        res = protos.GenerateContentResponse(
+            candidates=[
+                protos.Candidate(
+                    content=protos.Content(
+                        parts=[protos.Part(text=json_strs[len(requests) - 1])],
+                        role="model",
+                    ),
+                    finish_reason="STOP",
+                )
+            ]
+        )
+
+        return GenerateContentResponse(done=True, iterator=None, result=res, chunks=[])
+
+    monkeypatch.setattr(model.client, "generate_content", mock_generate_content)
+    return requests
+
+
+def test_invalid_response_retried(monkeypatch):
+    model = GeminiLanguageModel("1234")
+    valid = '{"field_descriptions": [{"field_name": "Sexe", "translation": "Sex"}]}'
+    requests = mock_responses(
+        model, monkeypatch, '{"field_descriptions": [{"field_name": "Sexe"}]}', valid
+    )
+
+    result = model.get_definitions(["Sexe"], "fr")
+
+    assert [d.translation for d in result] == ["Sex"]
+    assert len(requests) == 2
+    # the invalid response and the error are sent back to be corrected
+    assert [c["role"] for c in requests[1]] == ["user", "model", "user"]
+    assert "translation" in requests[1][2]["parts"][0]
+
+
+def test_invalid_response_raises_after_retries(monkeypatch):
+    model = GeminiLanguageModel("1234")
+    requests = mock_responses(model, monkeypatch, *["not json"] * 3)
+
+    with pytest.raises(ValueError):
+        model.get_definitions(["Sexe"], "fr")
+
+    assert len(requests) == 3
+
+
+def test_generation_config_schema_converted_once():
+    config = generation_config(ValuesRequest)
+
+    assert isinstance(config["response_schema"], protos.Schema)
+    assert generation_config(ValuesRequest) is config
+
+
+def test_map_values_prompt_canonical(monkeypatch):
+    model = GeminiLanguageModel("1234")
+    valid = '{"values": []}'
+    requests = mock_responses(model, monkeypatch, valid, valid)
+
+    model.map_values([("pet", {"oui", "non"}, ["True", "False", None])], "fr")
+    model.map_values([("pet", {"non", "oui"}, ["True", "False", None])], "fr")
+
+    prompts = [r[0]["parts"][1] for r in requests]
+    assert prompts[0] == prompts[1]
+    assert prompts[0].endswith('[["pet",["non","oui"],["True","False",null]]]')
+
+
+def test_get_definitions_cache_skips_mismatch(monkeypatch, tmp_path):
+    valid = '{"field_descriptions": [{"field_name": "Sexe", "translation": "Sex"}]}'
+    mismatched = (
+        '{"field_descriptions": [{"field_name": "AgeAns", "translation": "Age"}]}'
+    )
+
+    model = GeminiLanguageModel("1234", cache_dir=tmp_path)
+    requests = mock_responses(model, monkeypatch, mismatched, valid, valid)
+
+    # a response not matching the headers is returned but not cached
+    assert model.get_definitions(["Sexe"], "fr")[0].field_name == "AgeAns"
+    assert not list(tmp_path.rglob("*.json"))
+
+    assert model.get_definitions(["Sexe"], "fr")[0].translation == "Sex"
+    assert model.get_definitions(["Sexe"], "fr")[0].translation == "Sex"
+    assert len(requests) == 2
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_get_definitions_cache_ignores_corrupt_file(monkeypatch, tmp_path):
+    valid = '{"field_descriptions": [{"field_name": "Sexe", "translation": "Sex"}]}'
+
+    model = GeminiLanguageModel("1234", cache_dir=tmp_path)
+    requests = mock_responses(model, monkeypatch, valid, valid)
+    model.get_definitions(["Sexe"], "fr")
+
+    (cached,) = tmp_path.rglob("*.json")
+    cached.write_text('{"field_descriptions": [')
+
+    assert model.get_definitions(["Sexe"], "fr")[0].translation == "Sex"
+    assert len(requests) == 2
+    # the corrupt file is replaced by the new response
+    assert "Sex" in cached.read_text()
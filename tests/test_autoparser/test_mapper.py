@@ -128,22 +128,22 @@ def test_common_values():
     common_vals = pd.Series(
         data=[
             None,
-            {"orientale", "kinshasa", "katanga", "equateur"},
+            ["equateur", "orientale", "katanga", "kinshasa"],
             None,
-            {"poisson", "fish", "rept", "oiseau", "mammifère", "amphibie"},
+            ["fish", "amphibie", "oiseau", "mammifère", "poisson", "rept"],
             None,
             None,
             None,
             None,
-            {"m", "f", "inconnu"},
-            {"vivant", "décédé"},
+            ["f", "m", "inconnu"],
+            ["vivant", "décédé"],
             None,
-            {"non", "oui"},
-            {"non", "oui"},
-            {"non", "oui", "autres", "voyage"},
-            {"non", "oui"},
-            {"non", "oui"},
-            {"non", "oui"},
+            ["oui", "non"],
+            ["non", "oui"],
+            ["non", "voyage", "autres", "oui"],
+            ["oui", "non"],
+            ["oui", "non"],
+            ["oui", "non"],
         ],
         index=[
             "Identité",
@@ -168,6 +168,71 @@ def test_common_values():
     pd.testing.assert_series_equal(mapper.common_values, common_vals, check_names=False)
 
 
+def test_common_values_all_missing():
+    df = pd.DataFrame(
+        {
+            "source_field": ["test", "other"],
+            "source_description": ["test", "other"],
+            "source_type": ["string", "number"],
+            "common_values": [np.nan, np.nan],
+        }
+    )
+
+    mapper = MapperTest(
+        df,
+        Path("tests/test_autoparser/schemas/animals.schema.json"),
+        "fr",
+    )
+
+    assert mapper.common_values.to_dict() == {"test": None, "other": None}
+
+
+@pytest.mark.parametrize(
+    "common_values", [[1.0, np.nan], [True, False], [1, 2], [np.nan, "oui, non"]]
+)
+def test_common_values_not_strings(common_values):
+    df = pd.DataFrame(
+        {
+            "source_field": ["test", "other"],
+            "source_description": ["test", "other"],
+            "source_type": ["string", "number"],
+            "common_values": common_values,
+        }
+    )
+
+    mapper = MapperTest(
+        df,
+        Path("tests/test_autoparser/schemas/animals.schema.json"),
+        "fr",
+    )
+
+    expected = ["oui", "non"] if isinstance(common_values[1], str) else None
+    assert mapper.common_values.to_dict() == {"test": None, "other": expected}
+
+
+def test_common_values_repeated_index():
+    df = pd.DataFrame(
+        {
+            "source_field": ["test", "other"],
+            "source_description": ["test", "other"],
+            "source_type": ["string", "string"],
+            "common_values": ["Oui, non", "x, y"],
+        },
+        index=[0, 0],
+    )
+
+    mapper = MapperTest(
+        df,
+        Path("tests/test_autoparser/schemas/animals.schema.json"),
+        "fr",
+    )
+
+    assert mapper.common_values.to_dict() == {
+        "test": ["oui", "non"],
+        "other": ["x", "y"],
+    }
+
+
 def test_missing_common_values():
     df = pd.DataFrame(
         {
@@ -300,6 +365,28 @@ def test_match_fields_to_schema_dummy_data():
     pd.testing.assert_series_equal(mapper.mapped_fields, df["source_field"])
 
 
+def test_match_fields_to_schema_unique_descriptions(monkeypatch):
+    mapper = MapperTest(
+        "tests/test_autoparser/sources/animals_dd_described.csv",
+        Path("tests/test_autoparser/schemas/animals.schema.json"),
+        "fr",
+    )
+
+    sent = []
+    map_fields = mapper.model.map_fields
+
+    def recorded_map_fields(source_fields, target_fields):
+        sent.extend(source_fields)
+        return map_fields(source_fields, target_fields)
+
+    monkeypatch.setattr(mapper.model, "map_fields", recorded_map_fields)
+
+    mapper.match_fields_to_schema()
+
+    assert mapper.data_dictionary.source_description.duplicated().any()
+    assert sent == list(mapper.data_dictionary.source_description.unique())
+
+
 def test_match_values_to_schema_dummy_data():
     mapper = ANIMAL_MAPPER
 
@@ -320,6 +407,32 @@ def test_match_values_to_schema_dummy_data():
     }
 
 
+def test_match_values_to_schema_batched(monkeypatch):
+    mapper = MapperTest(
+        "tests/test_autoparser/sources/animals_dd_described.csv",
+        Path("tests/test_autoparser/schemas/animals.schema.json"),
+        "fr",
+    )
+    mapper.match_fields_to_schema()
+
+    batches = []
+    map_values = mapper.model.map_values
+
+    def recorded_map_values(values, language):
+        batches.append([v[0] for v in values])
+        return map_values(values, language)
+
+    monkeypatch.setattr(mapper.model, "map_values", recorded_map_values)
+    monkeypatch.setattr("adtl.autoparser.mapping.LLM_VALUES_BATCH_SIZE", 2)
+
+    mapper.match_values_to_schema()
+
+    fields = [f for b in batches for f in b]
+    assert len(batches) > 1 and all(len(b) <= 2 for b in batches)
+    assert len(fields) == len(set(fields))
+    assert set(fields) >= {"classification", "case_status", "sex", "pet"}
+
+
 def test_class_create_mapping_no_save():
     mapper = ANIMAL_MAPPER
 
@@ -19,6 +19,11 @@ def test_init():
     assert model.client is not None
     assert model.model == "gpt-4o-mini"
 
+    # models with the same key share a client
+    assert OpenAILanguageModel("1234", model="gpt-4o").client is model.client
+    assert OpenAILanguageModel("5678").client is not model.client
+    assert not hasattr(model, "__dict__")
+
 
 def test_get_definitions(monkeypatch):
     model = OpenAILanguageModel("1234")
@@ -141,3 +146,34 @@ def test_map_values(monkeypatch):
 
     # Assert the expected output
     assert result == map_values()
+
+
+def test_map_fields_refusal_cached(monkeypatch, tmp_path):
+    model = OpenAILanguageModel("1234", cache_dir=tmp_path)
+
+    # a refusal has no parsed response
+    def mock_parse(*args, **kwargs):
+        return ParsedChatCompletion(
+            id="foo",
+            model="gpt-4o-mini",
+            object="chat.completion",
+            choices=[
+                ParsedChoice(
+                    message=ParsedChatCompletionMessage(
+                        content=None,
+                        refusal="I can't help with that.",
+                        role="assistant",
+                        parsed=None,
+                    ),
+                    finish_reason="stop",
+                    index=0,
+                )
+            ],
+            created=int(datetime.datetime.now().timestamp()),
+        )
+
+    monkeypatch.setattr(model.client.beta.chat.completions, "parse", mock_parse)
+
+    # returned as without a cache, and not cached
+    assert model.map_fields(["foo"], ["bar"]) is None
+    assert not list(tmp_path.rglob("*.json"))
@@ -5,7 +5,11 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import pytest
-import tomli
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    import tomli as tomllib
 
 import adtl.autoparser as autoparser
 from adtl.autoparser import ParserGenerator
@@ -227,6 +231,36 @@ def test_single_field_mapping(row, expected):
     assert parser.single_field_mapping(row) == expected
 
 
+def test_make_toml_table_combined_type():
+    mappings = pd.read_csv("tests/test_autoparser/sources/animals_mapping.csv")
+    mappings.loc[1, "target_field"] = mappings.loc[0, "target_field"]
+
+    parser = ParserGenerator(
+        mappings,
+        Path("tests/test_autoparser/schemas"),
+        "animals",
+        config=Path(CONFIG_PATH),
+    )
+
+    with pytest.raises(NotImplementedError, match="CombinedType not supported"):
+        parser.make_toml_table("animals")
+
+
+def test_references_definitions_no_choices():
+    mappings = pd.read_csv("tests/test_autoparser/sources/animals_mapping.csv")
+    mappings["value_mapping"] = np.nan
+
+    parser = ParserGenerator(
+        mappings,
+        Path("tests/test_autoparser/schemas"),
+        "animals",
+        config=Path(CONFIG_PATH),
+    )
+
+    assert parser.references_definitions == ({}, {})
+    assert parser.header["adtl"]["defs"] == {}
+
+
 def test_create_parser(tmp_path, snapshot):
     parser = ANIMAL_PARSER
 
@@ -235,7 +269,7 @@ def test_create_parser(tmp_path, snapshot):
     parser.create_parser(file_name=file)
 
     with file.open("rb") as fp:
-        parser_file = tomli.load(fp)
+        parser_file = tomllib.load(fp)
 
     # check body of parser file
     assert parser_file["animals"] == snapshot
@@ -252,7 +286,7 @@ def test_create_parser_ap_access(tmp_path, snapshot):
     )
 
     with file.open("rb") as fp:
-        parser_file = tomli.load(fp)
+        parser_file = tomllib.load(fp)
 
     # check body of parser file
     assert parser_file["animals"] == snapshot
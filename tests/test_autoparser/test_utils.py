@@ -7,6 +7,7 @@ import pandas as pd
 import pytest
 
 from adtl.autoparser.util import (
+    batched_llm_call,
     load_data_dict,
     parse_choices,
     read_config_schema,
@@ -98,6 +99,19 @@ def test_load_data_dict():
         load_data_dict(CONFIG, "tests/test_autoparser/sources/animals.txt")
 
 
+def test_load_data_dict_does_not_modify_dataframe():
+    dd_original = pd.read_csv("tests/test_autoparser/sources/animals_dd.csv")
+    columns = list(dd_original.columns)
+
+    data = load_data_dict(CONFIG, dd_original)
+
+    assert list(dd_original.columns) == columns
+    npt.assert_array_equal(
+        data.columns,
+        ["source_field", "source_description", "source_type", "common_values"],
+    )
+
+
 def test_setup_llm_no_key():
     with pytest.raises(ValueError, match="API key required to set up an LLM"):
         setup_llm("openai", None)
@@ -106,3 +120,20 @@ def test_setup_llm_no_key():
 def test_setup_llm_bad_provider():
     with pytest.raises(ValueError, match="Unsupported LLM provider: fish"):
         setup_llm("fish", "abcd")
+
+
+def test_batched_llm_call():
+    calls = []
+
+    def echo(batch, suffix):
+        calls.append(batch)
+        return [f"{item}{suffix}" for item in batch]
+
+    items = [str(i) for i in range(7)]
+
+    assert batched_llm_call(echo, items, "!", batch_size=3) == [f"{i}!" for i in items]
+    assert sorted(map(len, calls)) == [1, 3, 3]
+
+    calls.clear()
+    assert batched_llm_call(echo, items, "!") == [f"{i}!" for i in items]
+    assert calls == [items]